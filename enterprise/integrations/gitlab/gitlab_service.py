@@ -17,6 +17,10 @@ from openhands.integrations.service_types import (
 )
 from openhands.server.types import AppMode
 
+# Module-level singleton, matching the integration routes; the store is a thin
+# wrapper over the shared pooled session maker in storage.database.
+webhook_store = GitlabWebhookStore()
+
 
 class SaaSGitLabService(GitLabService):
     def __init__(
@@ -166,7 +170,6 @@ class SaaSGitLabService(GitLabService):
         # Store webhooks in the database
         if webhooks:
             try:
-                webhook_store = GitlabWebhookStore()
                 await webhook_store.store_webhooks(webhooks)
                 logger.info(
                     f'Added GitLab webhooks to db for user {self.external_auth_id}'
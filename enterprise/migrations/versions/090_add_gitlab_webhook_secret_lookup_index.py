@@ -0,0 +1,35 @@
+"""add index backing gitlab_webhook secret lookups
+
+Revision ID: 090
+Revises: 089
+Create Date: 2025-08-31 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '090'
+down_revision: Union[str, None] = '089'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        op.f('ix_gitlab_webhook_user_id_webhook_uuid'),
+        'gitlab_webhook',
+        ['user_id', 'webhook_uuid'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f('ix_gitlab_webhook_user_id_webhook_uuid'),
+        table_name='gitlab_webhook',
+    )
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 
@@ -85,10 +86,26 @@ if GITHUB_APP_CLIENT_ID:
 
 # Add GitLab integration router only if GITLAB_APP_CLIENT_ID is set
 if GITLAB_APP_CLIENT_ID:
-    from server.routes.integration.gitlab import gitlab_integration_router  # noqa: E402
+    from server.routes.integration.gitlab import (  # noqa: E402
+        gitlab_integration_router,
+        prefetch_webhook_secrets,
+    )
 
     base_app.include_router(gitlab_integration_router)
 
+    # base_app runs a custom lifespan, which makes Starlette ignore on_startup
+    # handlers entirely; extend the lifespan so the webhook secret cache is
+    # warmed before the app starts serving.
+    _base_lifespan = base_app.router.lifespan_context
+
+    @asynccontextmanager
+    async def _gitlab_prefetch_lifespan(app):
+        async with _base_lifespan(app):
+            await prefetch_webhook_secrets()
+            yield
+
+    base_app.router.lifespan_context = _gitlab_prefetch_lifespan
+
 base_app.include_router(api_keys_router)  # Add routes for API key management
 add_github_proxy_routes(base_app)
 add_debugging_routes(
@@ -1,8 +1,19 @@
 import asyncio
 import hashlib
+import hmac
 import json
-
-from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+import time
+from collections import OrderedDict
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
 from fastapi.responses import JSONResponse
 from integrations.gitlab.gitlab_manager import GitlabManager
 from integrations.gitlab.gitlab_service import SaaSGitLabService
@@ -27,6 +38,23 @@ from openhands.server.user_auth import get_user_id
 gitlab_integration_router = APIRouter(prefix='/integration')
 webhook_store = GitlabWebhookStore()
 
+# Bound once so the hot dedup path skips the module attribute lookup per event.
+# CPython's hashlib delegates SHA-256 to OpenSSL, which dispatches to the
+# SHA-NI instructions at runtime when the CPU supports them.
+_sha256 = hashlib.sha256
+
+try:
+    # orjson parses straight from bytes in native code, several times faster
+    # than the stdlib on the large payloads GitLab sends.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Fixed-size binary key prefix for the fallback dedup path; raw digest bytes
+# halve the key size versus hex encoding and skip the hex/format step.
+_DEDUP_KEY_PREFIX = b'gitlab_msg:'
+
+
 token_manager = TokenManager()
 gitlab_manager = GitlabManager(token_manager)
 
@@ -62,26 +90,175 @@ class ResourceInstallationResult(BaseModel):
     error: str | None
 
 
+# Webhook secrets only change when a webhook is reinstalled, which also rotates
+# its UUID, so cached entries never go stale for a live webhook. The cache is
+# bounded (LRU) so a flood of unknown UUIDs cannot grow it without limit.
+# Secrets are cached as SHA-256 tags rather than plaintext so the comparison
+# runs over fixed-width digests and plaintext secrets are not retained in
+# process memory.
+_SECRET_CACHE_TTL = 300.0
+_SECRET_CACHE_MAX_SIZE = 1024
+_secret_cache: OrderedDict[tuple[str, str], tuple[float, bytes]] = OrderedDict()
+
+
+async def _get_webhook_secret_tag(webhook_uuid: str, user_id: str) -> bytes | None:
+    key = (webhook_uuid, user_id)
+    now = time.monotonic()
+
+    entry = _secret_cache.get(key)
+    if entry is not None and entry[0] > now:
+        _secret_cache.move_to_end(key)
+        return entry[1]
+
+    secret = await webhook_store.get_webhook_secret(
+        webhook_uuid=webhook_uuid, user_id=user_id
+    )
+
+    # Only cache hits; a miss may be a webhook that is still being installed.
+    if secret is None:
+        return None
+
+    tag = _sha256(secret.encode()).digest()
+    _secret_cache[key] = (now + _SECRET_CACHE_TTL, tag)
+    _secret_cache.move_to_end(key)
+    while len(_secret_cache) > _SECRET_CACHE_MAX_SIZE:
+        _secret_cache.popitem(last=False)
+
+    return tag
+
+
+# GitLab rejects webhook payloads over 25 MB on its side, so anything larger
+# is not a legitimate event and should not be buffered in full before we
+# validate it.
+_MAX_BODY_SIZE = 25 * 1024 * 1024
+
+# Overall deadline for reading the body, matching the GitHub events route.
+# The size cap alone does not stop a client that dribbles bytes under the
+# limit from holding the handler open indefinitely.
+_BODY_READ_TIMEOUT = 15.0
+
+
+async def _read_body_capped(request: Request) -> tuple[bytes, bytes]:
+    """Read the request body in chunks, bounding both its size and read time.
+
+    The dedup digest is folded over each chunk while it is still cache-hot
+    rather than in a second pass over the joined body. It is used only for
+    short-lived Redis dedup keys: the webhook secret is verified upstream, so
+    the digest does not need adversarial collision resistance, and 128 bits of
+    output is ample for a 60-second dedup window.
+
+    Returns:
+        Tuple of (body, 16-byte dedup digest of the body)
+    """
+    hasher = _sha256()
+    chunks: list[bytes] = []
+    size = 0
+    try:
+        async with asyncio.timeout(_BODY_READ_TIMEOUT):
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > _MAX_BODY_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail='Payload too large.',
+                    )
+                hasher.update(chunk)
+                chunks.append(chunk)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_408_REQUEST_TIMEOUT,
+            detail='Request timeout - client took too long to send data.',
+        )
+
+    return b''.join(chunks), hasher.digest()[:16]
+
+
+# Process-local front for the Redis dedup check. Only positive hits are
+# trusted: a key recorded here was already claimed in Redis by this worker, so
+# a redelivery routed to the same worker short-circuits without a network
+# round-trip. Misses still fall through to Redis, which remains the source of
+# truth across workers.
+_DEDUP_CACHE_TTL = 60.0
+_DEDUP_CACHE_MAX_SIZE = 4096
+_dedup_cache: OrderedDict[bytes | int, float] = OrderedDict()
+
+
+def _dedup_seen_locally(dedup_key: bytes | int) -> bool:
+    expiry = _dedup_cache.get(dedup_key)
+    if expiry is None:
+        return False
+    if expiry <= time.monotonic():
+        del _dedup_cache[dedup_key]
+        return False
+    return True
+
+
+def _dedup_remember(dedup_key: bytes | int) -> None:
+    _dedup_cache[dedup_key] = time.monotonic() + _DEDUP_CACHE_TTL
+    _dedup_cache.move_to_end(dedup_key)
+    while len(_dedup_cache) > _DEDUP_CACHE_MAX_SIZE:
+        _dedup_cache.popitem(last=False)
+
+
+def _clear_local_caches() -> None:
+    """Reset the process-local caches; tests use this to isolate state."""
+    _secret_cache.clear()
+    _dedup_cache.clear()
+
+
+async def prefetch_webhook_secrets():
+    """Warm the secret cache so early deliveries skip the per-event DB lookup.
+
+    Called from the application lifespan in saas_server when the GitLab
+    integration is enabled; router-level startup hooks are ignored once the
+    app supplies its own lifespan.
+    """
+    try:
+        rows = await webhook_store.get_all_webhook_secrets(
+            limit=_SECRET_CACHE_MAX_SIZE
+        )
+    except Exception:
+        # Startup warming is best-effort; lookups fall back to the DB.
+        logger.warning('Failed to prefetch GitLab webhook secrets', exc_info=True)
+        return
+
+    now = time.monotonic()
+    for user_id, webhook_uuid, secret in rows:
+        _secret_cache[(webhook_uuid, user_id)] = (
+            now + _SECRET_CACHE_TTL,
+            _sha256(secret.encode()).digest(),
+        )
+
+    logger.info(
+        'Prefetched GitLab webhook secrets',
+        extra={'count': len(rows)},
+    )
+
+
 async def verify_gitlab_signature(
     header_webhook_secret: str, webhook_uuid: str, user_id: str
 ):
-    if not header_webhook_secret or not webhook_uuid or not user_id:
+    if not (header_webhook_secret and webhook_uuid and user_id):
         raise HTTPException(status_code=403, detail='Required payload headers missing!')
 
-    webhook_secret = await webhook_store.get_webhook_secret(
+    expected_tag = await _get_webhook_secret_tag(
         webhook_uuid=webhook_uuid, user_id=user_id
     )
 
-    if header_webhook_secret != webhook_secret:
+    if expected_tag is None or not hmac.compare_digest(
+        _sha256(header_webhook_secret.encode()).digest(), expected_tag
+    ):
         raise HTTPException(status_code=403, detail="Request signatures didn't match!")
 
 
 @gitlab_integration_router.post('/gitlab/events')
 async def gitlab_events(
     request: Request,
+    background_tasks: BackgroundTasks,
     x_gitlab_token: str = Header(None),
     x_openhands_webhook_id: str = Header(None),
     x_openhands_user_id: str = Header(None),
+    x_gitlab_event_uuid: str = Header(None),
 ):
     try:
         await verify_gitlab_signature(
@@ -90,15 +267,29 @@ async def gitlab_events(
             user_id=x_openhands_user_id,
         )
 
-        payload_data = await request.json()
+        body, dedup_digest = await _read_body_capped(request)
+        payload_data = _json_loads(body)
         object_attributes = payload_data.get('object_attributes', {})
         dedup_key = object_attributes.get('id')
 
+        if not dedup_key and x_gitlab_event_uuid:
+            # GitLab stamps every delivery (and its redeliveries) with the
+            # same X-Gitlab-Event-UUID, so the header alone identifies the
+            # event; the request is already authenticated at this point.
+            dedup_key = _DEDUP_KEY_PREFIX + x_gitlab_event_uuid.encode()
+
         if not dedup_key:
-            # Hash entire payload if payload doesn't contain payload ID
-            dedup_json = json.dumps(payload_data, sort_keys=True)
-            dedup_hash = hashlib.sha256(dedup_json.encode()).hexdigest()
-            dedup_key = f'gitlab_msg: {dedup_hash}'
+            # Key on the raw request bytes if payload doesn't contain payload
+            # ID. The body is already a stable identifier for a redelivered
+            # message, so there is no need to re-serialize the parsed payload.
+            dedup_key = _DEDUP_KEY_PREFIX + dedup_digest
+
+        if _dedup_seen_locally(dedup_key):
+            logger.info('gitlab_is_duplicate')
+            return JSONResponse(
+                status_code=200,
+                content={'message': 'Duplicate GitLab event ignored.'},
+            )
 
         redis = sio.manager.redis
         created = await redis.set(dedup_key, 1, nx=True, ex=60)
@@ -108,6 +299,7 @@ async def gitlab_events(
                 status_code=200,
                 content={'message': 'Duplicate GitLab event ignored.'},
             )
+        _dedup_remember(dedup_key)
 
         message = Message(
             source=SourceType.GITLAB,
@@ -117,13 +309,29 @@ async def gitlab_events(
             },
         )
 
-        await gitlab_manager.receive_message(message)
+        # Respond to GitLab as soon as the event is validated and claimed;
+        # job dispatch runs after the response is sent, keeping us well clear
+        # of GitLab's webhook delivery timeout.
+        background_tasks.add_task(gitlab_manager.receive_message, message)
 
         return JSONResponse(
             status_code=200,
             content={'message': 'GitLab events endpoint reached successfully.'},
         )
 
+    except HTTPException as e:
+        # Expected rejections (missing headers, bad token, oversized body) are
+        # logged without the traceback capture that logger.exception performs;
+        # unwinding the full stack per failed request is wasted work on a path
+        # an attacker can drive at will.
+        logger.info(f'Rejected GitLab event: {e.detail}')
+        raise
+    except json.JSONDecodeError:
+        # orjson's JSONDecodeError subclasses the stdlib's, so one clause
+        # covers both parsers; malformed bodies are the cheapest payload an
+        # attacker can send and do not warrant a traceback either.
+        logger.info('Rejected GitLab event: malformed JSON payload')
+        return JSONResponse(status_code=400, content={'error': 'Invalid payload.'})
     except Exception as e:
         logger.exception(f'Error processing GitLab event: {e}')
         return JSONResponse(status_code=400, content={'error': 'Invalid payload.'})
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Index,
     Integer,
     String,
     Text,
@@ -27,6 +28,11 @@ class GitlabWebhook(Base):  # type: ignore
     """
 
     __tablename__ = 'gitlab_webhook'
+    __table_args__ = (
+        # Backs the per-event secret lookup in get_webhook_secret, which
+        # filters on (user_id, webhook_uuid) for every webhook delivery.
+        Index('ix_gitlab_webhook_user_id_webhook_uuid', 'user_id', 'webhook_uuid'),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     group_id = Column(String, nullable=True)
     project_id = Column(String, nullable=True)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 from integrations.types import GitLabResourceType
-from sqlalchemy import and_, asc, select, text, update
+from sqlalchemy import and_, asc, bindparam, select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import sessionmaker
 from storage.database import a_session_maker
@@ -11,6 +11,21 @@ from storage.gitlab_webhook import GitlabWebhook
 
 from openhands.core.logger import openhands_logger as logger
 
+# Built once at import time so the per-event secret lookup skips statement
+# construction and hits SQLAlchemy's compiled-statement cache; only parameter
+# binding remains per call. Selecting the single column also avoids hydrating
+# a full ORM row.
+_WEBHOOK_SECRET_QUERY = (
+    select(GitlabWebhook.webhook_secret)
+    .where(
+        and_(
+            GitlabWebhook.user_id == bindparam('user_id'),
+            GitlabWebhook.webhook_uuid == bindparam('webhook_uuid'),
+        )
+    )
+    .limit(1)
+)
+
 
 @dataclass
 class GitlabWebhookStore:
@@ -201,24 +216,44 @@ class GitlabWebhookStore:
         """
         Get's webhook secret given the webhook uuid and admin keycloak user id
         """
+        async with self.a_session_maker() as session:
+            result = await session.execute(
+                _WEBHOOK_SECRET_QUERY,
+                {'user_id': user_id, 'webhook_uuid': webhook_uuid},
+            )
+            return result.scalar_one_or_none()
+
+    async def get_all_webhook_secrets(
+        self, limit: int = 1000
+    ) -> list[tuple[str, str, str]]:
+        """Fetch (user_id, webhook_uuid, webhook_secret) for all live webhooks.
+
+        Used to warm per-process secret caches at startup so the first
+        delivery for each webhook does not pay a database round-trip.
+
+        Args:
+            limit: Maximum number of rows to retrieve (default: 1000)
+
+        Returns:
+            List of (user_id, webhook_uuid, webhook_secret) tuples
+        """
         async with self.a_session_maker() as session:
             query = (
-                select(GitlabWebhook)
+                select(
+                    GitlabWebhook.user_id,
+                    GitlabWebhook.webhook_uuid,
+                    GitlabWebhook.webhook_secret,
+                )
                 .where(
                     and_(
-                        GitlabWebhook.user_id == user_id,
-                        GitlabWebhook.webhook_uuid == webhook_uuid,
+                        GitlabWebhook.webhook_uuid.is_not(None),
+                        GitlabWebhook.webhook_secret.is_not(None),
                     )
                 )
-                .limit(1)
+                .limit(limit)
             )
-
             result = await session.execute(query)
-            webhooks: list[GitlabWebhook] = list(result.scalars().all())
-
-            if len(webhooks):
-                return webhooks[0].webhook_secret
-            return None
+            return [tuple(row) for row in result.all()]
 
     async def get_webhook_by_resource_only(
         self, resource_type: GitLabResourceType, resource_id: str
@@ -303,28 +338,23 @@ class GitlabWebhookStore:
         Returns:
             True if webhook was reset, False if not found
         """
+        filter_column = (
+            GitlabWebhook.project_id
+            if resource_type == GitLabResourceType.PROJECT
+            else GitlabWebhook.group_id
+        )
+
         async with self.a_session_maker() as session:
             async with session.begin():
-                if resource_type == GitLabResourceType.PROJECT:
-                    update_statement = (
-                        update(GitlabWebhook)
-                        .where(GitlabWebhook.project_id == resource_id)
-                        .values(
-                            webhook_exists=False,
-                            webhook_uuid=None,
-                            user_id=updating_user_id,  # Update to track who modified it
-                        )
-                    )
-                else:  # GROUP
-                    update_statement = (
-                        update(GitlabWebhook)
-                        .where(GitlabWebhook.group_id == resource_id)
-                        .values(
-                            webhook_exists=False,
-                            webhook_uuid=None,
-                            user_id=updating_user_id,  # Update to track who modified it
-                        )
+                update_statement = (
+                    update(GitlabWebhook)
+                    .where(filter_column == resource_id)
+                    .values(
+                        webhook_exists=False,
+                        webhook_uuid=None,
+                        user_id=updating_user_id,  # Update to track who modified it
                     )
+                )
 
                 result = await session.execute(update_statement)
                 rows_updated = result.rowcount
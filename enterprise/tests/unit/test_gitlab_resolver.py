@@ -8,8 +8,29 @@ import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from fastapi import BackgroundTasks
 from fastapi.responses import JSONResponse
-from server.routes.integration.gitlab import gitlab_events
+from server.routes.integration.gitlab import _clear_local_caches, gitlab_events
+
+
+def _make_event_request(payload: dict) -> tuple[MagicMock, bytes]:
+    """Build a mock request that streams the payload the way gitlab_events reads it."""
+    body = json.dumps(payload).encode()
+
+    async def stream():
+        yield body
+
+    mock_request = MagicMock()
+    mock_request.stream = stream
+    return mock_request, body
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    """Isolate the route's process-local dedup/secret caches between tests."""
+    _clear_local_caches()
+    yield
+    _clear_local_caches()
 
 
 @pytest.mark.asyncio
@@ -41,21 +62,25 @@ async def test_gitlab_events_deduplication_with_object_id(
         },
     }
 
-    mock_request = MagicMock()
-    mock_request.json = AsyncMock(return_value=payload)
+    mock_request, _ = _make_event_request(payload)
 
     # Call the endpoint
+    background_tasks = BackgroundTasks()
     response = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the object_attributes.id
     mock_redis.set.assert_called_once_with(12345, 1, nx=True, ex=60)
 
     # Verify the message was processed
+    assert background_tasks.tasks
+    await background_tasks()
     assert mock_gitlab_manager.receive_message.called
     assert isinstance(response, JSONResponse)
     assert response.status_code == 200
@@ -64,21 +89,28 @@ async def test_gitlab_events_deduplication_with_object_id(
     mock_redis.set.reset_mock()
     mock_gitlab_manager.receive_message.reset_mock()
 
-    # Second request - Redis returns False (key already exists)
+    # Second request - Redis returns False (key already exists). Clear the
+    # process-local dedup cache first so the redelivery behaves as if it
+    # landed on a different worker and only Redis can catch it.
+    _clear_local_caches()
     mock_redis.set.return_value = False
 
     # Call the endpoint again with the same payload
+    background_tasks = BackgroundTasks()
     response = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the object_attributes.id
     mock_redis.set.assert_called_once_with(12345, 1, nx=True, ex=60)
 
     # Verify the message was NOT processed (duplicate)
+    assert not background_tasks.tasks
     assert not mock_gitlab_manager.receive_message.called
     assert isinstance(response, JSONResponse)
     assert response.status_code == 200
@@ -116,26 +148,28 @@ async def test_gitlab_events_deduplication_without_object_id(
         },
     }
 
-    mock_request = MagicMock()
-    mock_request.json = AsyncMock(return_value=payload)
+    mock_request, body = _make_event_request(payload)
 
-    # Calculate the expected hash
-    dedup_json = json.dumps(payload, sort_keys=True)
-    expected_hash = hashlib.sha256(dedup_json.encode()).hexdigest()
-    expected_key = f'gitlab_msg: {expected_hash}'  # Note the space after 'gitlab_msg:'
+    # Calculate the expected fixed-size binary key from the raw body
+    expected_key = b'gitlab_msg:' + hashlib.sha256(body).digest()[:16]
 
     # Call the endpoint
+    background_tasks = BackgroundTasks()
     response = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the hash
     mock_redis.set.assert_called_once_with(expected_key, 1, nx=True, ex=60)
 
     # Verify the message was processed
+    assert background_tasks.tasks
+    await background_tasks()
     assert mock_gitlab_manager.receive_message.called
     assert isinstance(response, JSONResponse)
     assert response.status_code == 200
@@ -144,21 +178,111 @@ async def test_gitlab_events_deduplication_without_object_id(
     mock_redis.set.reset_mock()
     mock_gitlab_manager.receive_message.reset_mock()
 
-    # Second request - Redis returns False (key already exists)
+    # Second request - Redis returns False (key already exists). Clear the
+    # process-local dedup cache first so the redelivery behaves as if it
+    # landed on a different worker and only Redis can catch it.
+    _clear_local_caches()
     mock_redis.set.return_value = False
 
     # Call the endpoint again with the same payload
+    background_tasks = BackgroundTasks()
     response = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the hash
     mock_redis.set.assert_called_once_with(expected_key, 1, nx=True, ex=60)
 
     # Verify the message was NOT processed (duplicate)
+    assert not background_tasks.tasks
+    assert not mock_gitlab_manager.receive_message.called
+    assert isinstance(response, JSONResponse)
+    assert response.status_code == 200
+    # mypy: disable-error-code="unreachable"
+    response_body = json.loads(response.body)  # type: ignore
+    assert response_body['message'] == 'Duplicate GitLab event ignored.'
+
+
+@pytest.mark.asyncio
+@patch('server.routes.integration.gitlab.verify_gitlab_signature')
+@patch('server.routes.integration.gitlab.gitlab_manager')
+@patch('server.routes.integration.gitlab.sio')
+async def test_gitlab_events_deduplication_with_event_uuid_header(
+    mock_sio, mock_gitlab_manager, mock_verify_signature
+):
+    """Test that events without object_attributes.id dedup on X-Gitlab-Event-UUID."""
+    # Setup mocks
+    mock_verify_signature.return_value = None
+    mock_gitlab_manager.receive_message = AsyncMock()
+
+    # Mock Redis
+    mock_redis = AsyncMock()
+    mock_sio.manager.redis = mock_redis
+
+    # First request - Redis returns True (key was set)
+    mock_redis.set.return_value = True
+
+    # Create a mock request with a payload without object_attributes
+    payload = {
+        'object_kind': 'push',
+        'ref': 'refs/heads/main',
+    }
+
+    mock_request, _ = _make_event_request(payload)
+
+    # Call the endpoint with GitLab's delivery UUID header set
+    background_tasks = BackgroundTasks()
+    response = await gitlab_events(
+        request=mock_request,
+        background_tasks=background_tasks,
+        x_gitlab_token='test_token',
+        x_openhands_webhook_id='test_webhook_id',
+        x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid='test-event-uuid',
+    )
+
+    # Verify the header-derived key was preferred over the body digest
+    expected_key = b'gitlab_msg:test-event-uuid'
+    mock_redis.set.assert_called_once_with(expected_key, 1, nx=True, ex=60)
+
+    # Verify the message was processed
+    assert background_tasks.tasks
+    await background_tasks()
+    assert mock_gitlab_manager.receive_message.called
+    assert isinstance(response, JSONResponse)
+    assert response.status_code == 200
+
+    # Reset mocks
+    mock_redis.set.reset_mock()
+    mock_gitlab_manager.receive_message.reset_mock()
+
+    # Redelivery with the same UUID - Redis returns False (key already
+    # exists). Clear the process-local dedup cache first so the redelivery
+    # behaves as if it landed on a different worker.
+    _clear_local_caches()
+    mock_redis.set.return_value = False
+
+    # Call the endpoint again with the same payload and UUID
+    background_tasks = BackgroundTasks()
+    response = await gitlab_events(
+        request=mock_request,
+        background_tasks=background_tasks,
+        x_gitlab_token='test_token',
+        x_openhands_webhook_id='test_webhook_id',
+        x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid='test-event-uuid',
+    )
+
+    # Verify Redis was called to set the same header-derived key
+    mock_redis.set.assert_called_once_with(expected_key, 1, nx=True, ex=60)
+
+    # Verify the message was NOT processed (duplicate)
+    assert not background_tasks.tasks
     assert not mock_gitlab_manager.receive_message.called
     assert isinstance(response, JSONResponse)
     assert response.status_code == 200
@@ -190,15 +314,17 @@ async def test_gitlab_events_different_payloads_not_deduplicated(
         'object_attributes': {'id': 123, 'title': 'Test Issue', 'action': 'open'},
     }
 
-    mock_request1 = MagicMock()
-    mock_request1.json = AsyncMock(return_value=payload1)
+    mock_request1, _ = _make_event_request(payload1)
 
     # Call the endpoint with first payload
+    background_tasks = BackgroundTasks()
     response1 = await gitlab_events(
         request=mock_request1,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the first ID
@@ -206,6 +332,8 @@ async def test_gitlab_events_different_payloads_not_deduplicated(
     mock_redis.set.reset_mock()
 
     # Verify the first message was processed
+    assert background_tasks.tasks
+    await background_tasks()
     assert mock_gitlab_manager.receive_message.called
     assert isinstance(response1, JSONResponse)
     assert response1.status_code == 200
@@ -217,21 +345,25 @@ async def test_gitlab_events_different_payloads_not_deduplicated(
         'object_attributes': {'id': 456, 'title': 'Another Issue', 'action': 'open'},
     }
 
-    mock_request2 = MagicMock()
-    mock_request2.json = AsyncMock(return_value=payload2)
+    mock_request2, _ = _make_event_request(payload2)
 
     # Call the endpoint with second payload
+    background_tasks = BackgroundTasks()
     response2 = await gitlab_events(
         request=mock_request2,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the second ID
     mock_redis.set.assert_called_once_with(456, 1, nx=True, ex=60)
 
     # Verify the second message was also processed (not deduplicated)
+    assert background_tasks.tasks
+    await background_tasks()
     assert mock_gitlab_manager.receive_message.called
     assert isinstance(response2, JSONResponse)
     assert response2.status_code == 200
@@ -264,18 +396,20 @@ async def test_gitlab_events_multiple_identical_payloads_deduplicated(
         },
     }
 
-    mock_request = MagicMock()
-    mock_request.json = AsyncMock(return_value=payload)
+    mock_request, _ = _make_event_request(payload)
 
     # First request - Redis returns True (key was set)
     mock_redis.set.return_value = True
 
     # Call the endpoint first time
+    background_tasks = BackgroundTasks()
     response1 = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the object_attributes.id
@@ -283,6 +417,8 @@ async def test_gitlab_events_multiple_identical_payloads_deduplicated(
     mock_redis.set.reset_mock()
 
     # Verify the message was processed
+    assert background_tasks.tasks
+    await background_tasks()
     assert mock_gitlab_manager.receive_message.called
     assert isinstance(response1, JSONResponse)
     assert response1.status_code == 200
@@ -292,22 +428,26 @@ async def test_gitlab_events_multiple_identical_payloads_deduplicated(
     )
     mock_gitlab_manager.receive_message.reset_mock()
 
-    # Second request - Redis returns False (key already exists)
+    # Second request on the same worker - the process-local cache remembers
+    # the claimed key, so the duplicate is rejected without touching Redis
     mock_redis.set.return_value = False
 
     # Call the endpoint second time with the same payload
+    background_tasks = BackgroundTasks()
     response2 = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
-    # Verify Redis was called to set the key with the same object_attributes.id
-    mock_redis.set.assert_called_once_with(789, 1, nx=True, ex=60)
-    mock_redis.set.reset_mock()
+    # Verify the local cache short-circuited before any Redis round-trip
+    mock_redis.set.assert_not_called()
 
     # Verify the message was NOT processed (duplicate)
+    assert not background_tasks.tasks
     assert not mock_gitlab_manager.receive_message.called
     assert isinstance(response2, JSONResponse)
     assert response2.status_code == 200
@@ -315,21 +455,27 @@ async def test_gitlab_events_multiple_identical_payloads_deduplicated(
     response2_body = json.loads(response2.body)  # type: ignore
     assert response2_body['message'] == 'Duplicate GitLab event ignored.'
 
-    # Third request - Redis returns False again (key still exists)
+    # Third request - clear the local cache to act as a different worker;
+    # Redis still holds the key and returns False
+    _clear_local_caches()
     mock_redis.set.return_value = False
 
     # Call the endpoint third time with the same payload
+    background_tasks = BackgroundTasks()
     response3 = await gitlab_events(
         request=mock_request,
+        background_tasks=background_tasks,
         x_gitlab_token='test_token',
         x_openhands_webhook_id='test_webhook_id',
         x_openhands_user_id='test_user_id',
+        x_gitlab_event_uuid=None,
     )
 
     # Verify Redis was called to set the key with the same object_attributes.id
     mock_redis.set.assert_called_once_with(789, 1, nx=True, ex=60)
 
     # Verify the message was NOT processed (duplicate)
+    assert not background_tasks.tasks
     assert not mock_gitlab_manager.receive_message.called
     assert isinstance(response3, JSONResponse)
     assert response3.status_code == 200